@@ -13,10 +13,10 @@ from app import models
 
 # --- Data Fetching Functions ---
 
-def get_symbols(data: str):
-    """Get the list of unique symbols from the data."""
+def get_symbols(data: str | pd.DataFrame):
+    """Get the list of unique symbols from the data (a CSV path/URL or an already loaded DataFrame)."""
     try:
-        df = pd.read_csv(data)
+        df = data if isinstance(data, pd.DataFrame) else pd.read_csv(data)
         symbols = df['VALEUR'].unique().tolist()
         s=[]
         s.extend(symbol for symbol in symbols)
@@ -102,7 +102,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     access_token = auth.create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "user": user}
 
 @app.post("/auth/login", response_model=schemas.Token)
 def auth_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
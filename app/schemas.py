@@ -289,6 +289,7 @@ class MarketData(MarketDataBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    user: Optional[User] = None  # returned on login so clients can skip a /users/me round trip
 
 
 class UserResponse(BaseModel):
@@ -14,9 +14,18 @@ const authActions = {
   CLEAR_ERROR: 'CLEAR_ERROR',
 };
 
+// Last profile seen for the stored token, so a page reload renders without waiting on /users/me
+const readCachedUser = () => {
+  try {
+    return JSON.parse(localStorage.getItem('user'));
+  } catch {
+    return null;
+  }
+};
+
 // Initial State
 const initialState = {
-  user: null,
+  user: localStorage.getItem('token') ? readCachedUser() : null,
   token: localStorage.getItem('token'),
   isAuthenticated: !!localStorage.getItem('token'),
   isLoading: false,
@@ -87,7 +96,9 @@ export function AuthProvider({ children }) {
 
   const fetchCurrentUser = async () => {
     try {
+      // Revalidates the cached profile (and the token) in the background
       const user = await ApiService.getCurrentUser();
+      localStorage.setItem('user', JSON.stringify(user));
       dispatch({ type: authActions.SET_USER, payload: user });
     } catch (error) {
       console.error('Failed to fetch current user:', error);
@@ -104,8 +115,9 @@ export function AuthProvider({ children }) {
       localStorage.setItem('token', response.access_token);
       ApiService.setToken(response.access_token);
       
-      // Then fetch user data
-      const user = await ApiService.getCurrentUser();
+      // The login response carries the user; only older backends need the /users/me round trip
+      const user = response.user ?? await ApiService.getCurrentUser();
+      localStorage.setItem('user', JSON.stringify(user));
       
       dispatch({
         type: authActions.LOGIN_SUCCESS,
@@ -140,6 +152,7 @@ export function AuthProvider({ children }) {
 
   const logout = () => {
     ApiService.logout();
+    localStorage.removeItem('user');
     dispatch({ type: authActions.LOGOUT });
   };
 
@@ -1,9 +1,13 @@
+import ast
 import json
+import orjson
 import pandas as pd
 import numpy as np
 import os
 import joblib
-from scipy.stats import percentileofscore
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from numba import njit, prange
 from statsmodels.tsa.arima.model import ARIMA
 
 # Calculate PROB_LIQUIDITY for historical data
@@ -18,6 +22,74 @@ def compute_liquidity(volume, close, avg_range, epsilon=1e-6):
         denom = epsilon
     return np.log(numerator / denom)
 
+@njit(parallel=True, cache=True)
+def liquidity_percentiles(volumes, closes, rars, code_ids, sorted_hist_concat, hist_offsets, eps, out_probs):
+    """
+    Compute liquidity and its historical percentile for every row in a single pass.
+
+    Equivalent to compute_liquidity followed by percentileofscore(kind='rank') / 100
+    against the CODE's historical distribution. Rows with code_id == -1 are left
+    untouched, non-finite liquidity gives 0.0 and an empty history gives NaN.
+
+    Args:
+        volumes, closes, rars: float64 arrays of volume, close and rolling average range.
+        code_ids: int32 array indexing into hist_offsets (-1 for unknown CODE).
+        sorted_hist_concat: Concatenation of the sorted per-CODE historical liquidity arrays.
+        hist_offsets: Cumulative sizes, CODE k owns sorted_hist_concat[hist_offsets[k]:hist_offsets[k + 1]].
+        eps: Floor used when the rolling average range is not positive.
+        out_probs: float64 output array, filled in place.
+    """
+    for i in prange(volumes.size):
+        code = code_ids[i]
+        if code < 0:
+            continue
+
+        numerator = volumes[i] * closes[i]
+        if not numerator > 0:
+            out_probs[i] = 0.0  # No trades -> lowest possible liquidity
+            continue
+        denom = rars[i]
+        if denom <= 0:
+            denom = eps
+        liq = np.log(numerator / denom)
+        if not np.isfinite(liq):
+            out_probs[i] = 0.0
+            continue
+
+        hist = sorted_hist_concat[hist_offsets[code]:hist_offsets[code + 1]]
+        n = hist.size
+        if n == 0:
+            out_probs[i] = np.nan
+            continue
+        left = np.searchsorted(hist, liq, side='left')
+        right = np.searchsorted(hist, liq, side='right')
+        plus1 = 1 if left < right else 0
+        out_probs[i] = (left + right + plus1) * (50.0 / n) / 100.0
+
+def flatten_liquidity_history(historical_liquidity: dict) -> tuple[list, np.ndarray, np.ndarray]:
+    """
+    Pack the per-CODE historical liquidity arrays for liquidity_percentiles.
+
+    Returns:
+        tuple[list, np.ndarray, np.ndarray]: (codes, sorted_hist_concat, hist_offsets), where
+        codes[k] is the CODE owning slice k.
+    """
+    codes = [code for code in historical_liquidity if pd.notna(code)]
+    sorted_arrays = [np.sort(np.asarray(historical_liquidity[code], dtype=np.float64)) for code in codes]
+
+    hist_offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+    hist_offsets[1:] = np.cumsum([arr.size for arr in sorted_arrays])
+    sorted_hist_concat = np.concatenate(sorted_arrays) if sorted_arrays else np.empty(0, dtype=np.float64)
+
+    return codes, sorted_hist_concat, hist_offsets
+
+def ensure_datetime(series: pd.Series) -> pd.Series:
+    """Parse a SEANCE-like column to datetime, skipping the parse if it already is one."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    # Explicit ISO format avoids per-element inference; cache dedupes dates shared across CODEs
+    return pd.to_datetime(series, format='ISO8601', cache=True)
+
 def feature_engineer(market_df: pd.DataFrame, sentiment_df: pd.DataFrame, historical_indices_df: pd.DataFrame, historical_df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
     """
     Combines market data and sentiment data, adding engineered features.
@@ -31,19 +103,15 @@ def feature_engineer(market_df: pd.DataFrame, sentiment_df: pd.DataFrame, histor
     Returns:
         tuple[pd.DataFrame, dict]: A combined dataframe with features ready for forecasting/history and a dictionary of additional features.
     """
-    market_df = market_df.copy()
-    sentiment_df = sentiment_df.copy()
-    historical_indices_df = historical_indices_df.copy()
-    historical_df = historical_df.copy()
-
-    new_data_df = market_df.merge(sentiment_df, on=['VALEUR', 'SEANCE'], how='left')
+    # Inputs are never mutated: the column selection and merges below already return fresh frames
+    new_data_df = market_df.merge(sentiment_df, on=['VALEUR', 'SEANCE'], how='left', copy=False)
         
     historical_df = historical_df[['SEANCE', 'GROUPE', 'CODE', 'VALEUR', 'OUVERTURE', 'CLOTURE', 'PLUS_BAS', 'PLUS_HAUT', 'QUANTITE_NEGOCIEE', 'NB_TRANSACTION', 'CAPITAUX', 'Mean_Weighted_Sentiment', 'Article_Count', 'Sentiment_Intensity']]
-    historical_df = historical_df.merge(historical_indices_df, on='SEANCE', how='left')
+    historical_df = historical_df.merge(historical_indices_df, on='SEANCE', how='left', copy=False)
 
     # CRITICAL FIX: Compute historical liquidity BEFORE adding new data to avoid data leakage
     # This ensures the distribution is built only from historical data (like in the notebook)
-    historical_df['SEANCE'] = pd.to_datetime(historical_df['SEANCE'])
+    historical_df['SEANCE'] = ensure_datetime(historical_df['SEANCE'])
     historical_df = historical_df.sort_values(by=['CODE', 'SEANCE']).reset_index(drop=True)
     
     historical_liquidity = {}
@@ -73,8 +141,11 @@ def feature_engineer(market_df: pd.DataFrame, sentiment_df: pd.DataFrame, histor
 
     combined_df = pd.concat([historical_df, new_data_df], ignore_index=True, sort=False)
 
-    combined_df['SEANCE'] = pd.to_datetime(combined_df['SEANCE'])
+    combined_df['SEANCE'] = ensure_datetime(combined_df['SEANCE'])
     combined_df = combined_df.sort_values(by=['CODE', 'SEANCE']).reset_index(drop=True)
+    # Categorical keys make every CODE groupby below hash int codes instead of strings
+    combined_df['CODE'] = combined_df['CODE'].astype('category')
+    combined_df['GROUPE'] = combined_df['GROUPE'].astype('category')
 
     # Calculate INDICE_VEILLE as previous day's INDICE_JOUR (shifted by 1 day)
     indices_jour_cols = [
@@ -89,9 +160,9 @@ def feature_engineer(market_df: pd.DataFrame, sentiment_df: pd.DataFrame, histor
     
     # For each CODE group, shift INDICE_JOUR by 1 to get previous day's value
     for jour_col, veille_col in zip(indices_jour_cols, indices_veille_cols):
-        combined_df[veille_col] = combined_df.groupby('CODE')[jour_col].shift(1)
+        combined_df[veille_col] = combined_df.groupby('CODE', observed=True)[jour_col].shift(1)
         # Fill NaN with forward fill for the first row of each group
-        combined_df[veille_col] = combined_df.groupby('CODE')[veille_col].ffill()
+        combined_df[veille_col] = combined_df.groupby('CODE', observed=True)[veille_col].ffill()
     
     # Calculate VARIATION_VEILLE as % change from INDICE_VEILLE to INDICE_JOUR
     variation_cols = [
@@ -108,78 +179,61 @@ def feature_engineer(market_df: pd.DataFrame, sentiment_df: pd.DataFrame, histor
     ## financial features
     def compute_financial_features(group):
         """Compute financial features for each CODE group independently"""
+        ouverture = group['OUVERTURE'].to_numpy(dtype=np.float64, na_value=np.nan)
+        cloture = group['CLOTURE'].to_numpy(dtype=np.float64, na_value=np.nan)
+        plus_bas = group['PLUS_BAS'].to_numpy(dtype=np.float64, na_value=np.nan)
+        plus_haut = group['PLUS_HAUT'].to_numpy(dtype=np.float64, na_value=np.nan)
+        quantite = group['QUANTITE_NEGOCIEE'].to_numpy(dtype=np.float64, na_value=np.nan)
+        nb_transaction = group['NB_TRANSACTION'].to_numpy(dtype=np.float64, na_value=np.nan)
+        range_diff = plus_haut - plus_bas
         
         # 1. Intraday Volatility (Price Range as % of Close)
-        group['Intraday_Range_Pct'] = 0.0
-        valid_mask = group['CLOTURE'] > 0
-        group.loc[valid_mask, 'Intraday_Range_Pct'] = (
-            (group.loc[valid_mask, 'PLUS_HAUT'] - group.loc[valid_mask, 'PLUS_BAS']) / 
-            group.loc[valid_mask, 'CLOTURE']
+        group['Intraday_Range_Pct'] = np.divide(
+            range_diff, cloture, out=np.zeros_like(cloture), where=cloture > 0
         ) * 100
         
         # 2. Daily Return (% change from open to close)
-        group['Daily_Return_Pct'] = 0.0
-        valid_mask = group['OUVERTURE'] > 0
-        group.loc[valid_mask, 'Daily_Return_Pct'] = (
-            (group.loc[valid_mask, 'CLOTURE'] - group.loc[valid_mask, 'OUVERTURE']) / 
-            group.loc[valid_mask, 'OUVERTURE']
+        group['Daily_Return_Pct'] = np.divide(
+            cloture - ouverture, ouverture, out=np.zeros_like(ouverture), where=ouverture > 0
         ) * 100
         
-        # 3. Price Position in Range (0 to 1)
-        group['Price_Position'] = 0.5  # default to middle
-        range_diff = group['PLUS_HAUT'] - group['PLUS_BAS']
-        valid_mask = range_diff > 0
-        group.loc[valid_mask, 'Price_Position'] = (
-            (group.loc[valid_mask, 'CLOTURE'] - group.loc[valid_mask, 'PLUS_BAS']) / 
-            range_diff[valid_mask]
+        # 3. Price Position in Range (0 to 1), default to middle
+        price_position = np.divide(
+            cloture - plus_bas, range_diff, out=np.full_like(range_diff, 0.5), where=range_diff > 0
         )
+        group['Price_Position'] = np.clip(price_position, 0, 1)
         
         # 4. Average Trade Size
-        group['Avg_Trade_Size'] = 0.0
-        valid_mask = group['NB_TRANSACTION'] > 0
-        group.loc[valid_mask, 'Avg_Trade_Size'] = (
-            group.loc[valid_mask, 'QUANTITE_NEGOCIEE'] / 
-            group.loc[valid_mask, 'NB_TRANSACTION']
+        group['Avg_Trade_Size'] = np.divide(
+            quantite, nb_transaction, out=np.zeros_like(quantite), where=nb_transaction > 0
         )
         
         # 5. Price Impact
-        group['Price_Impact'] = 0.0
-        valid_mask = group['QUANTITE_NEGOCIEE'] > 0
-        price_change = abs(group['CLOTURE'] - group['OUVERTURE'])
-        group.loc[valid_mask, 'Price_Impact'] = (
-            price_change[valid_mask] / group.loc[valid_mask, 'QUANTITE_NEGOCIEE']
+        group['Price_Impact'] = np.divide(
+            np.abs(cloture - ouverture), quantite, out=np.zeros_like(quantite), where=quantite > 0
         )
         
-        # 6. Upper Shadow Ratio
-        group['Upper_Shadow_Ratio'] = 0.0
-        upper_body = group[['OUVERTURE', 'CLOTURE']].max(axis=1)
-        valid_mask = range_diff > 0
-        group.loc[valid_mask, 'Upper_Shadow_Ratio'] = (
-            (group.loc[valid_mask, 'PLUS_HAUT'] - upper_body[valid_mask]) / 
-            range_diff[valid_mask]
+        # 6. Upper Shadow Ratio (fmax/fmin skip NaN like DataFrame.max/min)
+        upper_body = np.fmax(ouverture, cloture)
+        upper_shadow = np.divide(
+            plus_haut - upper_body, range_diff, out=np.zeros_like(range_diff), where=range_diff > 0
         )
+        group['Upper_Shadow_Ratio'] = np.clip(upper_shadow, 0, 1)
         
         # 7. Lower Shadow Ratio
-        group['Lower_Shadow_Ratio'] = 0.0
-        lower_body = group[['OUVERTURE', 'CLOTURE']].min(axis=1)
-        valid_mask = range_diff > 0
-        group.loc[valid_mask, 'Lower_Shadow_Ratio'] = (
-            (lower_body[valid_mask] - group.loc[valid_mask, 'PLUS_BAS']) / 
-            range_diff[valid_mask]
+        lower_body = np.fmin(ouverture, cloture)
+        lower_shadow = np.divide(
+            lower_body - plus_bas, range_diff, out=np.zeros_like(range_diff), where=range_diff > 0
         )
+        group['Lower_Shadow_Ratio'] = np.clip(lower_shadow, 0, 1)
 
         # 8. Closing price variation from previous day
         group['VARIATION'] = group['CLOTURE'].pct_change() * 100
         group['VARIATION'] = group['VARIATION'].replace([np.inf, -np.inf], 0).fillna(0)
         
-        # Clamp ratios to [0, 1]
-        group['Price_Position'] = group['Price_Position'].clip(0, 1)
-        group['Upper_Shadow_Ratio'] = group['Upper_Shadow_Ratio'].clip(0, 1)
-        group['Lower_Shadow_Ratio'] = group['Lower_Shadow_Ratio'].clip(0, 1)
-        
         return group
     
-    combined_df = combined_df.groupby('CODE').apply(compute_financial_features).reset_index(drop=True)
+    combined_df = combined_df.groupby('CODE', observed=True).apply(compute_financial_features).reset_index(drop=True)
     
     #Sentiment rolling features
     combined_df['Mean_Weighted_Sentiment'] = combined_df['Mean_Weighted_Sentiment'].fillna(0)
@@ -188,55 +242,34 @@ def feature_engineer(market_df: pd.DataFrame, sentiment_df: pd.DataFrame, histor
 
     # Create rolling features to capture lingering effects
     for window in [3, 7]:
-        combined_df[f'Mean_Sentiment_{window}d'] = combined_df.groupby('CODE')['Mean_Weighted_Sentiment'].transform(
+        combined_df[f'Mean_Sentiment_{window}d'] = combined_df.groupby('CODE', observed=True)['Mean_Weighted_Sentiment'].transform(
             lambda x: x.rolling(window=window, min_periods=1).mean()
         )
-        combined_df[f'Intensity_{window}d'] = combined_df.groupby('CODE')['Sentiment_Intensity'].transform(
+        combined_df[f'Intensity_{window}d'] = combined_df.groupby('CODE', observed=True)['Sentiment_Intensity'].transform(
             lambda x: x.rolling(window=window, min_periods=1).mean()
         )
-        combined_df[f'Article_Count_{window}d'] = combined_df.groupby('CODE')['Article_Count'].transform(
+        combined_df[f'Article_Count_{window}d'] = combined_df.groupby('CODE', observed=True)['Article_Count'].transform(
             lambda x: x.rolling(window=window, min_periods=1).mean()
         )
 
     # Compute PROB_LIQUIDITY using the historical_liquidity computed before merging new data
-    combined_df['PROB_LIQUIDITY'] = np.nan
+    # combined_df is sorted by CODE then SEANCE, so the rolling window runs in date order
+    range_diff = combined_df['PLUS_HAUT'] - combined_df['PLUS_BAS']
+    rolling_avg_range = range_diff.groupby(combined_df['CODE'], observed=True).transform(
+        lambda x: x.rolling(window=5, min_periods=1).mean()
+    )
 
-    for code in combined_df['CODE'].unique():
-        if code not in historical_liquidity:
-            continue
-        
-        # Get indices for this code in the original dataset
-        code_mask = combined_df['CODE'] == code
-        stock_indices = combined_df[code_mask].index
-        
-        # Get stock data for this code
-        stock_df = combined_df[code_mask].sort_values('SEANCE').copy()
-        
-        # Calculate rolling 5-day average range
-        stock_df['range'] = stock_df['PLUS_HAUT'] - stock_df['PLUS_BAS']
-        stock_df['rolling_avg_range'] = stock_df['range'].rolling(window=5, min_periods=1).mean()
-        
-        # Get historical liquidity distribution for this ticker
-        hist_liq = historical_liquidity[code]
-        
-        # Calculate liquidity and probability for each row
-        for idx, row in stock_df.iterrows():
-            volume = row['QUANTITE_NEGOCIEE']
-            close = row['CLOTURE']
-            rolling_avg_range = row['rolling_avg_range']
-            
-            # Compute liquidity
-            liquidity_val = compute_liquidity(volume, close, rolling_avg_range, epsilon)
-            
-            # Compute probability based on historical distribution
-            if np.isfinite(liquidity_val):
-                prob = percentileofscore(hist_liq, liquidity_val) / 100.0
-            else:
-                # Zero volume -> minimum liquidity -> probability = 0
-                prob = 0.0
-            
-            # Update the dataset with the computed probability using the original index
-            combined_df.loc[idx, 'PROB_LIQUIDITY'] = prob
+    liq_codes, sorted_hist_concat, hist_offsets = flatten_liquidity_history(historical_liquidity)
+    code_ids = pd.Categorical(combined_df['CODE'], categories=liq_codes).codes.astype(np.int32)
+
+    prob_liquidity = np.full(len(combined_df), np.nan)
+    liquidity_percentiles(
+        combined_df['QUANTITE_NEGOCIEE'].to_numpy(dtype=np.float64, na_value=np.nan),
+        combined_df['CLOTURE'].to_numpy(dtype=np.float64, na_value=np.nan),
+        rolling_avg_range.to_numpy(dtype=np.float64, na_value=np.nan),
+        code_ids, sorted_hist_concat, hist_offsets, epsilon, prob_liquidity
+    )
+    combined_df['PROB_LIQUIDITY'] = prob_liquidity
 
     # Reorder columns to match model training order
     feature_order = ['OUVERTURE',
@@ -314,7 +347,9 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
     Returns:
         pd.DataFrame: Forecast DataFrame with columns SEANCE, CODE, VALEUR, CLOTURE, VOLUME, VAR_CLOTURE, VAR_VOLUME, PROB_LIQUIDITY.
     """
-    dataset = processed_df.copy()
+    # Sort once so each ticker is a contiguous, date-ordered block (also a fresh frame, processed_df is untouched)
+    dataset = processed_df.sort_values(['CODE', 'SEANCE']).reset_index(drop=True)
+    ticker_indices = dataset.groupby('CODE', sort=False, observed=True).indices
     
     HORIZON = 5
     PRICE_MODELS_DIR = models_path
@@ -355,17 +390,16 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
             forecast_dates.append(candidate)
         candidate += pd.Timedelta(days=1)
 
-    # Forecast for each ticker
-    tickers = dataset['CODE'].unique()
-    forecast_rows = []
-
-    for code in tickers:
-        ticker_df = dataset[dataset['CODE'] == code].sort_values('SEANCE').reset_index(drop=True)
+    # Forecast for each ticker; tickers are independent, so run them on a thread pool.
+    # Model loading, ARIMA and XGBoost spend most of their time in native code that releases the GIL.
+    def forecast_ticker(code):
+        ticker_df = dataset.iloc[ticker_indices[code]].reset_index(drop=True)
         
         if len(ticker_df) < 20:
-            continue
+            return [], []
         
         origin_row = ticker_df.iloc[-1]
+        origin_features = ticker_df[xgb_residual_features].to_numpy()[-1:].reshape(1, -1)
         origin_close = origin_row['CLOTURE']
         origin_volume = origin_row['QUANTITE_NEGOCIEE']
         valeur = code_valeur_map.get(code, code)
@@ -381,7 +415,6 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
             price_arima_forecast = extended_price_arima.forecast(steps=HORIZON)
             
             # XGBoost residual prediction using last row features
-            origin_features = origin_row[xgb_residual_features].values.reshape(1, -1)
             price_xgb_pred = price_xgb.predict(origin_features)[0]
             
             forecasted_close = price_arima_forecast.values + price_xgb_pred
@@ -397,7 +430,6 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
             extended_vol_arima = vol_arima.apply(full_volume)
             vol_arima_forecast = extended_vol_arima.forecast(steps=HORIZON)
             
-            origin_features = origin_row[xgb_residual_features].values.reshape(1, -1)
             vol_xgb_pred = vol_xgb.predict(origin_features)[0]
             
             forecasted_volume = np.maximum(vol_arima_forecast.values + vol_xgb_pred, 0)
@@ -408,8 +440,8 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
         range_vals = (ticker_df['PLUS_HAUT'] - ticker_df['PLUS_BAS']).tail(5)
         last_avg_range = range_vals.mean()
         
-        # ---- Compute PROB_LIQUIDITY ----
-        hist_liq = historical_liquidity.get(code)
+        rows = []
+        liq_inputs = []  # (volume, close, avg range) scored after all tickers are done
         
         # Track previous day's values for day-over-day variation
         prev_close = origin_close
@@ -423,14 +455,7 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
             var_cloture = (fc_close - prev_close) / prev_close if prev_close != 0 else 0
             var_volume = (fc_volume - prev_volume) / prev_volume if prev_volume != 0 else 0
             
-            # Liquidity probability
-            prob_liq = 0.0  # Default: minimum liquidity
-            if hist_liq is not None and len(hist_liq) > 0:
-                liq_val = compute_liquidity(fc_volume, fc_close, last_avg_range, epsilon)
-                if np.isfinite(liq_val):
-                    prob_liq = percentileofscore(hist_liq, liq_val) / 100.0
-            
-            forecast_rows.append({
+            rows.append({
                 'SEANCE': forecast_dates[h],
                 'CODE': code,
                 'VALEUR': valeur,
@@ -438,12 +463,39 @@ def forecast(processed_df: pd.DataFrame, models_path: str, historical_liquidity:
                 'VOLUME': int(round(fc_volume)),
                 'VAR_CLOTURE': round(var_cloture, 6),
                 'VAR_VOLUME': round(var_volume, 6),
-                'PROB_LIQUIDITY': round(prob_liq, 4),
             })
+            liq_inputs.append((fc_volume, fc_close, last_avg_range))
             
             # Update previous day values for next iteration
             prev_close = fc_close
             prev_volume = fc_volume
+        
+        return rows, liq_inputs
+
+    tickers = list(ticker_indices)
+    with ThreadPoolExecutor(max_workers=min(16, os.cpu_count() or 1)) as executor:
+        ticker_results = list(executor.map(forecast_ticker, tickers))
+
+    forecast_rows = [row for rows, _ in ticker_results for row in rows]
+    liq_inputs = np.array(
+        [inputs for _, ticker_inputs in ticker_results for inputs in ticker_inputs], dtype=np.float64
+    ).reshape(-1, 3)
+    liq_tickers = [row['CODE'] for row in forecast_rows]
+
+    # ---- Compute PROB_LIQUIDITY ----
+    # Default 0.0 (minimum liquidity) for tickers without a historical distribution
+    liq_codes, sorted_hist_concat, hist_offsets = flatten_liquidity_history(historical_liquidity)
+    prob_liquidity = np.zeros(len(forecast_rows))
+    liquidity_percentiles(
+        np.ascontiguousarray(liq_inputs[:, 0]),
+        np.ascontiguousarray(liq_inputs[:, 1]),
+        np.ascontiguousarray(liq_inputs[:, 2]),
+        pd.Categorical(liq_tickers, categories=liq_codes).codes.astype(np.int32),
+        sorted_hist_concat, hist_offsets, epsilon, prob_liquidity
+    )
+    prob_liquidity = np.nan_to_num(prob_liquidity, nan=0.0)
+    for row, prob_liq in zip(forecast_rows, prob_liquidity):
+        row['PROB_LIQUIDITY'] = round(float(prob_liq), 4)
 
     # Build final DataFrame
     forecast_df = pd.DataFrame(forecast_rows)
@@ -462,48 +514,50 @@ def detect_anomalies_with_params(df: pd.DataFrame, anomaly_params: dict) -> pd.D
     Returns:
         pd.DataFrame: Input dataframe with anomaly flags added
     """
-    df = df.copy()
+    codes = df['CODE'].to_numpy()
+    volume = df['QUANTITE_NEGOCIEE'].to_numpy(dtype=np.float64, na_value=np.nan)
+    variation = df['VARIATION'].to_numpy(dtype=np.float64, na_value=np.nan)
     
     # Initialize columns
-    df['volume_z_score'] = 0.0
-    df['VOLUME_Anomaly'] = 0
-    df['variation_z_score'] = 0.0
-    df['VARIATION_ANOMALY'] = 0
+    volume_z_score = np.zeros(len(df))
+    volume_anomaly = np.zeros(len(df), dtype=int)
+    variation_z_score = np.zeros(len(df))
+    variation_anomaly = np.zeros(len(df), dtype=int)
     
     for code in df['CODE'].unique():
         if code not in anomaly_params:
             continue
             
         params = anomaly_params[code]
-        code_mask = df['CODE'] == code
+        code_mask = codes == code
         
         # Volume z-score using FIXED historical parameters
         volume_mean = params['volume_mean']
         volume_std = params['volume_std']
         
         if volume_std > 0:
-            df.loc[code_mask, 'volume_z_score'] = (
-                (df.loc[code_mask, 'QUANTITE_NEGOCIEE'] - volume_mean) / volume_std
-            )
+            volume_z_score = np.where(code_mask, (volume - volume_mean) / volume_std, volume_z_score)
         
-        df.loc[code_mask, 'VOLUME_Anomaly'] = (
-            df.loc[code_mask, 'volume_z_score'] > params['volume_threshold']
-        ).astype(int)
+        volume_anomaly = np.where(code_mask, volume_z_score > params['volume_threshold'], volume_anomaly)
         
         # Variation z-score using FIXED historical parameters
         variation_mean = params['variation_mean']
         variation_std = params['variation_std']
         
         if variation_std > 0:
-            df.loc[code_mask, 'variation_z_score'] = (
-                (df.loc[code_mask, 'VARIATION'] - variation_mean) / variation_std
-            )
+            variation_z_score = np.where(code_mask, (variation - variation_mean) / variation_std, variation_z_score)
         
-        df.loc[code_mask, 'VARIATION_ANOMALY'] = (
-            np.abs(df.loc[code_mask, 'variation_z_score']) > params['variation_threshold']
-        ).astype(int)
+        variation_anomaly = np.where(
+            code_mask, np.abs(variation_z_score) > params['variation_threshold'], variation_anomaly
+        )
     
-    return df
+    # assign returns a new frame, so the caller's df is not mutated
+    return df.assign(
+        volume_z_score=volume_z_score,
+        VOLUME_Anomaly=volume_anomaly,
+        variation_z_score=variation_z_score,
+        VARIATION_ANOMALY=variation_anomaly,
+    )
 
 def link_anomalies_to_news(df: pd.DataFrame, news_window=3) -> pd.DataFrame:
     """
@@ -516,63 +570,54 @@ def link_anomalies_to_news(df: pd.DataFrame, news_window=3) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Input dataframe with news-linked anomaly flags
     """
-    df = df.copy()
+    # sort_values returns a new frame, so the caller's df is never mutated
     df = df.sort_values(['CODE', 'SEANCE'])
     
-    # Identify news events
-    df['has_news'] = (df['Article_Count'] > 0).astype(int)
-    df['news_pos'] = ((df['Article_Count'] > 0) & (df['Mean_Weighted_Sentiment'] > 0)).astype(int)
-    df['news_neg'] = ((df['Article_Count'] > 0) & (df['Mean_Weighted_Sentiment'] < 0)).astype(int)
+    # Identify news events (helper series are kept local instead of added as columns)
+    has_news = (df['Article_Count'] > 0).astype(int)
+    news_pos = ((df['Article_Count'] > 0) & (df['Mean_Weighted_Sentiment'] > 0)).astype(int)
+    news_neg = ((df['Article_Count'] > 0) & (df['Mean_Weighted_Sentiment'] < 0)).astype(int)
     
     # Prior news (for post-news analysis)
-    grouped = df.groupby('CODE')
-    df['prior_any_news'] = grouped['has_news'].transform(
-        lambda x: x.rolling(window=news_window, min_periods=1).sum().shift(1).fillna(0)
-    ) > 0
-    df['prior_pos_news'] = grouped['news_pos'].transform(
-        lambda x: x.rolling(window=news_window, min_periods=1).sum().shift(1).fillna(0)
-    ) > 0
-    df['prior_neg_news'] = grouped['news_neg'].transform(
-        lambda x: x.rolling(window=news_window, min_periods=1).sum().shift(1).fillna(0)
-    ) > 0
+    def get_prior_rolling(series, w):
+        return series.rolling(window=w, min_periods=1).sum().shift(1).fillna(0)
+    
+    prior_any_news = has_news.groupby(df['CODE'], observed=True).transform(lambda x: get_prior_rolling(x, news_window)) > 0
+    prior_pos_news = news_pos.groupby(df['CODE'], observed=True).transform(lambda x: get_prior_rolling(x, news_window)) > 0
+    prior_neg_news = news_neg.groupby(df['CODE'], observed=True).transform(lambda x: get_prior_rolling(x, news_window)) > 0
     
     # Future news (for pre-news/leakage analysis)
     def get_future_rolling(series, w):
         return series.iloc[::-1].rolling(window=w, min_periods=1).sum().shift(1).iloc[::-1].fillna(0) > 0
     
-    df['future_any_news'] = grouped['has_news'].transform(lambda x: get_future_rolling(x, news_window))
-    df['future_pos_news'] = grouped['news_pos'].transform(lambda x: get_future_rolling(x, news_window))
-    df['future_neg_news'] = grouped['news_neg'].transform(lambda x: get_future_rolling(x, news_window))
+    future_any_news = has_news.groupby(df['CODE'], observed=True).transform(lambda x: get_future_rolling(x, news_window))
+    future_pos_news = news_pos.groupby(df['CODE'], observed=True).transform(lambda x: get_future_rolling(x, news_window))
+    future_neg_news = news_neg.groupby(df['CODE'], observed=True).transform(lambda x: get_future_rolling(x, news_window))
     
     # VARIATION anomalies
     df['VARIATION_ANOMALY_POST_NEWS'] = 0
     df['VARIATION_ANOMALY_PRE_NEWS'] = 0
     
-    cond_var_post_pos = (df['VARIATION_ANOMALY'] == 1) & (df['variation_z_score'] > 0) & df['prior_pos_news']
-    cond_var_post_neg = (df['VARIATION_ANOMALY'] == 1) & (df['variation_z_score'] < 0) & df['prior_neg_news']
+    cond_var_post_pos = (df['VARIATION_ANOMALY'] == 1) & (df['variation_z_score'] > 0) & prior_pos_news
+    cond_var_post_neg = (df['VARIATION_ANOMALY'] == 1) & (df['variation_z_score'] < 0) & prior_neg_news
     df.loc[cond_var_post_pos | cond_var_post_neg, 'VARIATION_ANOMALY_POST_NEWS'] = 1
     
     not_post_var = (df['VARIATION_ANOMALY'] == 1) & (df['VARIATION_ANOMALY_POST_NEWS'] == 0)
-    cond_var_pre_pos = not_post_var & (df['variation_z_score'] > 0) & df['future_pos_news']
-    cond_var_pre_neg = not_post_var & (df['variation_z_score'] < 0) & df['future_neg_news']
+    cond_var_pre_pos = not_post_var & (df['variation_z_score'] > 0) & future_pos_news
+    cond_var_pre_neg = not_post_var & (df['variation_z_score'] < 0) & future_neg_news
     df.loc[cond_var_pre_pos | cond_var_pre_neg, 'VARIATION_ANOMALY_PRE_NEWS'] = 1
     
     # VOLUME anomalies
     df['VOLUME_ANOMALY_POST_NEWS'] = 0
     df['VOLUME_ANOMALY_PRE_NEWS'] = 0
     
-    cond_vol_post = (df['VOLUME_Anomaly'] == 1) & df['prior_any_news']
+    cond_vol_post = (df['VOLUME_Anomaly'] == 1) & prior_any_news
     df.loc[cond_vol_post, 'VOLUME_ANOMALY_POST_NEWS'] = 1
     
     not_post_vol = (df['VOLUME_Anomaly'] == 1) & (df['VOLUME_ANOMALY_POST_NEWS'] == 0)
-    cond_vol_pre = not_post_vol & df['future_any_news']
+    cond_vol_pre = not_post_vol & future_any_news
     df.loc[cond_vol_pre, 'VOLUME_ANOMALY_PRE_NEWS'] = 1
     
-    # Cleanup
-    df = df.drop(columns=['has_news', 'news_pos', 'news_neg', 
-                          'prior_any_news', 'prior_pos_news', 'prior_neg_news',
-                          'future_any_news', 'future_pos_news', 'future_neg_news'])
-    
     return df
 
 def detect_anomalies(combined_df: pd.DataFrame, anomaly_params: dict) -> pd.DataFrame:
@@ -586,9 +631,7 @@ def detect_anomalies(combined_df: pd.DataFrame, anomaly_params: dict) -> pd.Data
     Returns:
         pd.DataFrame: The input dataframe enriched with final anomaly flags.
     """
-    combined_df = combined_df.copy()
-    
-    # Detect anomalies using FIXED historical parameters
+    # Detect anomalies using FIXED historical parameters (returns a copy, combined_df is not mutated)
     combined_df = detect_anomalies_with_params(combined_df, anomaly_params)
     
     # Link anomalies to news (your existing logic)
@@ -621,12 +664,24 @@ def calc_daily_score(historical_df: pd.DataFrame, score_params: dict) -> pd.Data
     Returns:
         pd.DataFrame: DataFrame with additional score columns.
     """
-    df = historical_df.copy()
-    
-    # Extract unique daily values for indices (using groupby to handle repeated values per ticker)
-    market_daily = df.groupby('SEANCE').first().reset_index()[
-        ['SEANCE', 'TUNINDEX_INDICE_JOUR', 'TUNINDEX20_INDICE_JOUR']
-    ]
+    df = historical_df  # never mutated below: the latest-day filter returns a new frame
+    latest = df['SEANCE'].max()
+    
+    # Every per-day input in one grouped pass: the index levels (repeated per ticker, so
+    # 'first'), the breadth/intensity inputs and the liquidity and sentiment means.
+    # (x > 0) counts NaN variations as non-positive, as the previous per-day lambda did.
+    variation = df['VARIATION']
+    market_daily = df.assign(
+        _POSITIVE=(variation > 0).astype(np.float64),
+        _ABS_VARIATION=variation.abs(),
+    ).groupby('SEANCE').agg(
+        TUNINDEX_INDICE_JOUR=('TUNINDEX_INDICE_JOUR', 'first'),
+        TUNINDEX20_INDICE_JOUR=('TUNINDEX20_INDICE_JOUR', 'first'),
+        _BREADTH=('_POSITIVE', 'mean'),
+        _INTENSITY=('_ABS_VARIATION', 'mean'),
+        _LIQUIDITY=('PROB_LIQUIDITY', 'mean'),
+        _SENTIMENT=('Mean_Weighted_Sentiment', 'mean'),
+    ).reset_index()
     
     # --- Score 1: Market Direction ---
     # Formula: 50 + 25*z(ΔTUNINDEX) + 25*z(ΔTUNINDEX20)
@@ -647,12 +702,11 @@ def calc_daily_score(historical_df: pd.DataFrame, score_params: dict) -> pd.Data
     
     # --- Score 2: Market Breadth ---
     # Percentage of stocks with positive returns
-    breadth_series = df.groupby('SEANCE')['VARIATION'].apply(lambda x: (x > 0).mean() * 100)
-    market_daily = market_daily.merge(breadth_series.rename('BreadthScore'), on='SEANCE', how='left')
+    market_daily['BreadthScore'] = market_daily['_BREADTH'] * 100
     
     # --- Score 3: Market Intensity ---
     # Average absolute return, normalized using historical percentiles
-    intensity_raw = df.groupby('SEANCE')['VARIATION'].apply(lambda x: x.abs().mean())
+    intensity_raw = market_daily['_INTENSITY']
     
     p10 = score_params['intensity_p10']
     p90 = score_params['intensity_p90']
@@ -665,39 +719,36 @@ def calc_daily_score(historical_df: pd.DataFrame, score_params: dict) -> pd.Data
     
     # --- Score 4: Liquidity Score ---
     # Average probability of liquidity across all stocks
-    liquidity_series = df.groupby('SEANCE')['PROB_LIQUIDITY'].mean() * 100
-    market_daily = market_daily.merge(liquidity_series.rename('LiquidityScore'), on='SEANCE', how='left')
-    market_daily['LiquidityScore'] = market_daily['LiquidityScore'].fillna(50)
+    market_daily['LiquidityScore'] = (market_daily['_LIQUIDITY'] * 100).fillna(50)
     
     # --- Score 5: News Score ---
     # Z-score of daily average sentiment
-    daily_sentiment = df.groupby('SEANCE')['Mean_Weighted_Sentiment'].mean()
+    daily_sentiment = market_daily['_SENTIMENT']
     
     sent_mean = score_params['sentiment_mean']
     sent_std = score_params['sentiment_std']
-    z_sentiment = (daily_sentiment - sent_mean) / sent_std if sent_std > 0 else 0
-    
-    news_score = 50 + 50 * z_sentiment
-    market_daily = market_daily.merge(news_score.rename('NewsScore'), on='SEANCE', how='left')
-    market_daily['NewsScore'] = market_daily['NewsScore'].fillna(50).clip(0, 100)
+    # 50 + 50 * z, folded into one scale factor on the raw values (flat 50 when std is 0)
+    news_scale = 50.0 / sent_std if sent_std > 0 else 0.0
+    news_values = 50.0 + news_scale * (daily_sentiment.to_numpy() - sent_mean)
+    market_daily['NewsScore'] = pd.Series(news_values, index=market_daily.index).fillna(50).clip(0, 100)
     
     # --- Composite Score: Market Mood ---
     # Weighted average of all sub-scores
-    market_daily['MarketMood'] = (
-        0.30 * market_daily['DirectionScore'] +
-        0.20 * market_daily['BreadthScore'] + 
-        0.20 * market_daily['LiquidityScore'] + 
-        0.15 * market_daily['IntensityScore'] + 
-        0.15 * market_daily['NewsScore']
-    )
+    score_cols = ['DirectionScore', 'BreadthScore', 'LiquidityScore', 'IntensityScore', 'NewsScore']
+    score_weights = np.array([0.30, 0.20, 0.20, 0.15, 0.15])
+    market_daily['MarketMood'] = market_daily[score_cols].to_numpy(dtype=np.float64) @ score_weights
+    
+    # Only the latest SEANCE is returned: the full history was needed for the daily
+    # returns above, but the merge back only has to touch that day's rows
+    market_daily = market_daily[market_daily['SEANCE'] == latest]
+    df = df[df['SEANCE'] == latest]
     
     # Clean up columns to avoid duplicates
     cols_to_merge = ['DirectionScore', 'BreadthScore', 'LiquidityScore', 'IntensityScore', 'NewsScore', 'MarketMood']
     df = df.drop(columns=[c for c in cols_to_merge if c in df.columns], errors='ignore')
     
     # Merge scores back into the main dataframe
-    df = pd.merge(df, market_daily[['SEANCE'] + cols_to_merge], on='SEANCE', how='left')
-    df = df[df['SEANCE'] == df['SEANCE'].max()]
+    df = df.merge(market_daily[['SEANCE'] + cols_to_merge], on='SEANCE', how='left', validate='many_to_one')
     return df
 
 def process_sentiment(sentiment_path:str, new_date:str) -> pd.DataFrame:
@@ -709,56 +760,59 @@ def process_sentiment(sentiment_path:str, new_date:str) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Processed sentiment DataFrame with columns SEANCE, CODE, Mean_Weighted_Sentiment, Article_Count, Sentiment_Intensity.
     """
-    with open(sentiment_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
-
-    sentiment_df = pd.DataFrame(json_data['articles'])
+    # orjson parses straight from bytes, well ahead of json.load on large article dumps
+    with open(sentiment_path, 'rb') as f:
+        json_data = orjson.loads(f.read())
+
+    # Emit one row per (article, ticker) straight from the parsed JSON, so the
+    # tickers list never round-trips through a string and no explode is needed
+    rows = []
+    for article in json_data['articles']:
+        tickers = article['tickers']
+        if isinstance(tickers, str):
+            tickers = ast.literal_eval(tickers)
+        for ticker in tickers or []:
+            rows.append((article['date'], ticker, article['sentiment_score'], article['confidence']))
+
+    sentiment_df = pd.DataFrame(rows, columns=['date', 'VALEUR', 'sentiment_score', 'confidence'])
     sentiment_df['date'] = pd.to_datetime(sentiment_df['date'])
-    sentiment_df = sentiment_df[['date', 'tickers', 'sentiment_score', 'confidence']].reset_index(drop=True)
-    # Convert tickers column from string representation of list to actual list
-    sentiment_df['tickers'] = sentiment_df['tickers'].astype(str)
-    sentiment_df['tickers'] = sentiment_df['tickers'].apply(eval)
-
-    # Explode the tickers list into separate rows
-    sentiment_df = sentiment_df.explode('tickers')
-
-    # Rename tickers to VALEUR
-    sentiment_df = sentiment_df.rename(columns={'tickers': 'VALEUR'})
-
-    # Reset index to get consecutive row numbers
-    sentiment_df = sentiment_df.reset_index(drop=True)
+    # Only new_date is returned, so drop the rest of the history before any grouping
+    sentiment_df = sentiment_df[sentiment_df['date'] == pd.to_datetime(new_date)].reset_index(drop=True)
     
     sentiment_df['weighted_sentiment'] = sentiment_df['sentiment_score'] * sentiment_df['confidence']
 
-    daily_sentiment = sentiment_df.groupby(['VALEUR', 'date']).agg({
-        'weighted_sentiment': ['mean'],  # Mean weighted sentiment
-        'sentiment_score': 'count'  # Article count
-    }).reset_index()
+    # Absolute sentiment intensity input (sum of |s_i|)
+    sentiment_df['abs_weighted_sentiment'] = sentiment_df['weighted_sentiment'].abs()
 
-    # Flatten column names
-    daily_sentiment.columns = ['VALEUR', 'date', 'Mean_Weighted_Sentiment', 'Article_Count']
+    # Single pass: mean weighted sentiment, article count and absolute intensity
+    daily_sentiment = sentiment_df.groupby(['VALEUR', 'date'], sort=False).agg(
+        Mean_Weighted_Sentiment=('weighted_sentiment', 'mean'),
+        Article_Count=('sentiment_score', 'count'),
+        Sentiment_Intensity=('abs_weighted_sentiment', 'sum'),
+    ).reset_index()
 
     # Rename date to SEANCE for merging
     daily_sentiment = daily_sentiment.rename(columns={'date': 'SEANCE'})
 
-    # Compute absolute sentiment intensity (sum of |s_i|)
-    sentiment_df['abs_weighted_sentiment'] = sentiment_df['weighted_sentiment'].abs()
+    return daily_sentiment
 
-    absolute_intensity = sentiment_df.groupby(['VALEUR', 'date']).agg({
-        'abs_weighted_sentiment': 'sum'
-    }).reset_index()
+@lru_cache(maxsize=4)
+def _load_json(path: str, mtime: float) -> dict:
+    """Parse a JSON file; mtime is only part of the cache key so an edited file is re-read."""
+    with open(path, 'r') as f:
+        return json.load(f)
 
-    absolute_intensity.columns = ['VALEUR', 'SEANCE', 'Sentiment_Intensity']
 
-    # Merge absolute intensity with daily_sentiment
-    daily_sentiment = daily_sentiment.merge(absolute_intensity, on=['VALEUR', 'SEANCE'], how='left')
-    daily_sentiment = daily_sentiment[daily_sentiment['SEANCE'] == pd.to_datetime(new_date)]
+def load_params(params) -> dict:
+    """Return fitted parameters given either the dict itself or the path of its JSON file."""
+    if isinstance(params, dict):
+        return params
+    return _load_json(str(params), os.stat(params).st_mtime)
 
-    return daily_sentiment
 
 def analyze_new_data(new_date: str, market_df: pd.DataFrame, sentiment_path: str, 
                      historical_df: pd.DataFrame, historical_indices_df: pd.DataFrame,
-                     models_path: str, anomaly_params_path: str, score_params_path: str) -> tuple:
+                     models_path: str, anomaly_params_path: str | dict, score_params_path: str | dict) -> tuple:
     """
     Main pipeline function for real-time analysis.
     
@@ -768,19 +822,17 @@ def analyze_new_data(new_date: str, market_df: pd.DataFrame, sentiment_path: str
         historical_df: Historical market data
         historical_indices_df: Historical indices data
         models_path: Path to saved forecasting models
-        anomaly_params_path: Path to pre-fitted anomaly detection parameters
-        score_params_path: Path to pre-fitted daily score normalization parameters
+        anomaly_params_path: Path to pre-fitted anomaly detection parameters (or the parsed dict)
+        score_params_path: Path to pre-fitted daily score normalization parameters (or the parsed dict)
         
     Returns:
         tuple: (forecast_df, new_historical_df)
     """
     
     new_sentiment_output = process_sentiment(sentiment_path, new_date)
-    with open(anomaly_params_path, 'r') as f:
-        anomaly_params = json.load(f)
-
-    with open(score_params_path, 'r') as f:
-        score_params = json.load(f)
+    # Parsed once per file version; repeated refreshes reuse the cached dicts
+    anomaly_params = load_params(anomaly_params_path)
+    score_params = load_params(score_params_path)
 
     # 1. Feature Engineering (returns full combined dataset for ARIMA extension)
     combined_df, historical_liquidity, new_indices_output = feature_engineer(
@@ -1,8 +1,13 @@
 import sys
 import os
 import importlib
+import io
 import json
+import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, lru_cache
+from joblib import Memory
 
 # Get the project root directory (parent of utils directory)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -14,9 +19,12 @@ from real_time_utils import analyze_new_data
 from scraper.OCHL_scraper import fetch_aaz_df, build_valeur_lookup, build_target_table
 import real_time_utils
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.parquet as pq
 import importlib.util
 
-from news_sentiment_analysis.src.pipeline import live_engine
 
 # Define paths relative to project root
 REF_PATH = PROJECT_ROOT / "data" / "historical_data.csv"
@@ -25,36 +33,238 @@ sentiment_path = PROJECT_ROOT / "news_sentimental_analysis" / "exports" / "histo
 score_params_path = PROJECT_ROOT / "models" / "market_mood_params.json"
 models_path = PROJECT_ROOT / "models"
 anomaly_params_path = PROJECT_ROOT / "models" / "anomaly_params.json"
+# Also write the forecast as CSV next to the Parquet file (set to 0 once no reader needs it)
+WRITE_FORECAST_CSV = os.getenv("WRITE_FORECAST_CSV", "1") != "0"
 
-# Load historical data
-historical_indices_df = pd.read_csv(historical_indices_path, parse_dates=['SEANCE'])
-historical_df = pd.read_csv(REF_PATH, parse_dates=['SEANCE'])
-historical_df["SEANCE"] = pd.to_datetime(historical_df["SEANCE"], errors="coerce").dt.normalize()
-historical_indices_df["SEANCE"] = pd.to_datetime(historical_indices_df["SEANCE"], errors="coerce").dt.normalize()
+# Columns of historical_data.csv actually used by feature_engineer
+HISTORICAL_COLUMNS = [
+    'SEANCE', 'GROUPE', 'CODE', 'VALEUR', 'OUVERTURE', 'CLOTURE', 'PLUS_BAS', 'PLUS_HAUT',
+    'QUANTITE_NEGOCIEE', 'NB_TRANSACTION', 'CAPITAUX',
+    'Mean_Weighted_Sentiment', 'Article_Count', 'Sentiment_Intensity'
+]
 
+# Explicit Arrow types for the history CSVs; columns not listed here are inferred.
+# Dictionary-encoded strings come out of to_pandas() as categoricals.
+HISTORY_COLUMN_TYPES = {
+    'SEANCE': pa.timestamp('ns'),
+    'CODE': pa.dictionary(pa.int32(), pa.string()),
+    'VALEUR': pa.dictionary(pa.int32(), pa.string()),
+    **{col: pa.float64() for col in [
+        'OUVERTURE', 'CLOTURE', 'PLUS_BAS', 'PLUS_HAUT', 'QUANTITE_NEGOCIEE', 'NB_TRANSACTION',
+        'CAPITAUX', 'Mean_Weighted_Sentiment', 'Article_Count', 'Sentiment_Intensity',
+    ]},
+}
 
 
-def refresh_data():
+# Metadata key under which each mirror part records the CSV (st_size, st_mtime_ns) it matches
+MIRROR_SOURCE_KEY = b"source_csv"
+# Appends add one part file each; past this many the next read_history compacts them into one
+MIRROR_MAX_PARTS = 64
+
+
+def mirror_parts(mirror_dir):
+    """Part files of a Parquet mirror directory, oldest first (names are zero-padded sequence numbers)."""
+    return sorted(Path(mirror_dir).glob("part-*.parquet"))
+
+
+def csv_signature(csv_path):
+    """(st_size, st_mtime_ns) of csv_path, serialized for the mirror's schema metadata."""
+    st = os.stat(csv_path)
+    return json.dumps([st.st_size, st.st_mtime_ns]).encode()
+
+
+def write_mirror_part(table, mirror_dir, signature, seq):
+    """Write table as part number seq of mirror_dir, stamped with the CSV signature it matches."""
+    metadata = {**(table.schema.metadata or {}), MIRROR_SOURCE_KEY: signature}
+    pq.write_table(
+        table.replace_schema_metadata(metadata),
+        Path(mirror_dir) / f"part-{seq:05d}.parquet",
+        compression="zstd",
+    )
+
+
+def drop_mirror(mirror_dir):
+    """Remove a Parquet mirror so the next read_history rebuilds it from the CSV."""
+    mirror_dir = Path(mirror_dir)
+    if mirror_dir.is_dir():
+        shutil.rmtree(mirror_dir)
+    else:  # single-file mirror from before the directory layout
+        mirror_dir.unlink(missing_ok=True)
+
+
+def fresh_mirror(csv_path):
+    """
+    Return the Parquet mirror directory of csv_path if it matches the CSV, else None.
+
+    The newest part records the CSV's size and mtime (ns) as of its write; any other
+    change to the CSV since then leaves the mirror stale.
+    """
+    mirror_dir = Path(csv_path).with_suffix(".parquet")
+    parts = mirror_parts(mirror_dir) if mirror_dir.is_dir() else []
+    if not parts:
+        return None
+    metadata = pq.read_schema(parts[-1]).metadata or {}
+    if metadata.get(MIRROR_SOURCE_KEY) != csv_signature(csv_path):
+        return None
+    return mirror_dir
+
+
+def append_to_mirror(mirror_dir, csv_path, columns, csv_text):
+    """
+    Append rows (CSV text, no header, in the file's column order) to a Parquet mirror as a new part.
+
+    The rows are parsed against the newest part's Arrow schema (dictionary columns as their
+    plain values, then cast), so they get the types a full rebuild from the CSV would give;
+    the existing parts are not read or rewritten. On any failure the mirror is dropped and
+    the next read_history rebuilds it from the CSV.
+    """
+    try:
+        parts = mirror_parts(mirror_dir)
+        schema = pq.read_schema(parts[-1])
+        new = pacsv.read_csv(
+            io.BytesIO(csv_text.encode("utf-8")),
+            read_options=pacsv.ReadOptions(column_names=list(columns)),
+            convert_options=pacsv.ConvertOptions(
+                column_types={
+                    field.name: field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+                    for field in schema
+                },
+                strings_can_be_null=True,
+            ),
+        ).cast(schema)
+        seq = int(parts[-1].stem.split("-")[1]) + 1
+        write_mirror_part(new, mirror_dir, csv_signature(csv_path), seq)
+    except Exception as e:
+        print(f"Warning: Could not update Parquet mirror {mirror_dir}, dropping it: {e}")
+        drop_mirror(mirror_dir)
+
+
+def read_history(csv_path, columns=None):
+    """
+    Load a history CSV through a Parquet mirror stored next to it (same name, .parquet).
+
+    The mirror is a directory of part files read as one dataset. The CSV stays the source of
+    truth for the other readers; the mirror is typed and compressed, so no text or date
+    parsing happens on load. concat_df_if_new_date adds a part per append; the mirror is
+    rebuilt as a single part whenever the CSV changed some other way.
+    """
+    csv_path = Path(csv_path)
+    mirror_dir = csv_path.with_suffix(".parquet")
+
+    mirror = fresh_mirror(csv_path)
+    if mirror is not None and len(mirror_parts(mirror)) <= MIRROR_MAX_PARTS:
+        return pq.read_table(mirror, columns=columns).to_pandas(self_destruct=True)
+
+    # Signature taken before the read: a CSV written meanwhile leaves the new mirror stale
+    signature = csv_signature(csv_path)
+    if mirror is not None:
+        # Too many small parts: compact them (same rows, one file)
+        table = pq.read_table(mirror)
+    else:
+        # Multithreaded Arrow tokenizer with fixed column types instead of pd.read_csv inference
+        table = pacsv.read_csv(
+            csv_path,
+            convert_options=pacsv.ConvertOptions(column_types=HISTORY_COLUMN_TYPES, strings_can_be_null=True),
+        )
+    try:
+        drop_mirror(mirror_dir)
+        mirror_dir.mkdir()
+        write_mirror_part(table, mirror_dir, signature, 0)
+    except Exception as e:
+        print(f"Warning: Could not write Parquet mirror {mirror_dir}: {e}")
+    df = table.to_pandas(self_destruct=True)
+    del table
+    return df if columns is None else df[columns]
+
+
+# Historical data is loaded on first use rather than at import, and kept per file version:
+# the mtime argument is the cache key, so an appended CSV is picked up by the next refresh.
+# Callers must treat the returned frames as read-only (feature_engineer does not mutate them).
+@lru_cache(maxsize=1)
+def load_historical_df(mtime):
+    """historical_data.csv, restricted to HISTORICAL_COLUMNS, for the file version at mtime."""
+    historical_df = read_history(REF_PATH, columns=HISTORICAL_COLUMNS)
+    # SEANCE is already datetime64 (typed CSV read or Parquet mirror); only the time part is dropped
+    historical_df["SEANCE"] = historical_df["SEANCE"].dt.normalize()
+    # Repeated string keys as categories: int codes for groupby/merge hashing and a much smaller footprint
+    for col in ["VALEUR", "CODE", "GROUPE"]:
+        historical_df[col] = historical_df[col].astype("category")
+    return historical_df
+
+
+@lru_cache(maxsize=1)
+def load_historical_indices_df(mtime):
+    """index_historical_data.csv for the file version at mtime."""
+    historical_indices_df = read_history(historical_indices_path)
+    historical_indices_df["SEANCE"] = historical_indices_df["SEANCE"].dt.normalize()
+    return historical_indices_df
+
+
+# On-disk cache for values derived from the history; keyed on the CSV's mtime, so it
+# only rebuilds after the file actually changes (at most once per trading day).
+# Created on first use so importing this module leaves the filesystem untouched
+@cache
+def _cache_memory():
+    return Memory(PROJECT_ROOT / ".cache" / "refresh", verbose=0)
+
+
+def _valeur_lookup(path, mtime, df):
+    return build_valeur_lookup(df)
+
+
+def cached_valeur_lookup(path, mtime, df):
+    """build_valeur_lookup(df), persisted per (path, mtime) of the CSV df was loaded from."""
+    return _cache_memory().cache(_valeur_lookup, ignore=["df"])(path, mtime, df)
+
+
+@lru_cache(maxsize=4)
+def cached_symbols(path, mtime):
+    """Symbols of the history CSV at path, computed once per file version (mtime)."""
+    # Imported here: agent.utils pulls in app.models and SQLAlchemy
     from agent.utils import get_symbols
+
+    return tuple(get_symbols(load_historical_df(mtime)))
+
+
+def refresh_data():
+    # Imported here: the news pipeline pulls in the scrapers and NLP models, which only a
+    # refresh needs
+    from news_sentiment_analysis.src.pipeline import live_engine
+
     pipeline = live_engine.RealTimeSentimentPipeline()
-    pipeline.run_pipeline()
-    # Use the same reference dataset for both symbols and lookup
-    REF_DATASET = str(REF_PATH)
-    symbols = get_symbols(REF_DATASET)
-    print(symbols)
-    df_aaz = fetch_aaz_df()
-    df_aaz = df_aaz[df_aaz["Nom"].isin(symbols)]
+    # The news pipeline and the quotes scrape are independent network-bound steps: run them
+    # side by side and join before their outputs (history.json, df_aaz) are consumed
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        sentiment_future = executor.submit(pipeline.run_pipeline)
+        aaz_future = executor.submit(fetch_aaz_df)
+
+        # The history loads (or comes from cache) while the scrapes run; symbols and lookup
+        # are derived from it, keyed on the CSV version
+        historical_mtime = os.path.getmtime(REF_PATH)
+        historical_df = load_historical_df(historical_mtime)
+        historical_indices_df = load_historical_indices_df(os.path.getmtime(historical_indices_path))
+        symbols = cached_symbols(str(REF_PATH), historical_mtime)
+        print(symbols)
+        # Build lookup from the reference dataset
+        lookup = cached_valeur_lookup(str(REF_PATH), historical_mtime, historical_df)
+
+        df_aaz = aaz_future.result()
+        sentiment_future.result()
+
+    # Encode Nom against the symbols once: names outside the history get code -1, so the
+    # filter is an integer compare rather than a string lookup per row
+    nom_codes = pd.Categorical(df_aaz["Nom"], categories=pd.Index(symbols).dropna().unique()).codes
+    df_aaz = df_aaz[nom_codes != -1]
     print(len(df_aaz["Nom"].unique()))
     print()
 
-    # Load reference dataset once + build lookup
-    df_ref = pd.read_csv(REF_DATASET)
-    lookup = build_valeur_lookup(df_ref)
-
     # Build today table
     df_new = build_target_table(df_aaz, lookup, seance=None)
+    assert pd.api.types.is_datetime64_any_dtype(df_new["SEANCE"]), "build_target_table must return datetime SEANCE"
     date = df_new["SEANCE"].max()
-    df_new["SEANCE"] = pd.to_datetime(df_new["SEANCE"], errors="coerce").dt.normalize()
+    # Share the historical VALEUR categories so the merges in feature_engineer stay on int codes
+    valeur_categories = historical_df["VALEUR"].cat.categories.union(df_new["VALEUR"].dropna().unique())
+    df_new["VALEUR"] = df_new["VALEUR"].astype(pd.CategoricalDtype(valeur_categories))
     
     # Analyze new data
     forecast_df, new_historical_output, new_indices_output, new_sentiment_output = analyze_new_data(
@@ -68,38 +278,90 @@ def refresh_data():
         str(score_params_path)
     )
     
-    # Save forecast data
-    forecast_csv_path = PROJECT_ROOT / "data" / "forecast_next_5_days.csv"
-    forecast_df.to_csv(forecast_csv_path, index=False)
-    print(f"Saved forecast to {forecast_csv_path}")
+    # Save forecast data: Parquet for typed, compressed reads; the CSV is kept for the
+    # readers that still load it (app/crud.py) unless WRITE_FORECAST_CSV is turned off
+    forecast_parquet_path = PROJECT_ROOT / "data" / "forecast_next_5_days.parquet"
+    forecast_df.to_parquet(forecast_parquet_path, engine="pyarrow", compression="zstd", index=False)
+    print(f"Saved forecast to {forecast_parquet_path}")
+    if WRITE_FORECAST_CSV:
+        forecast_csv_path = PROJECT_ROOT / "data" / "forecast_next_5_days.csv"
+        forecast_df.to_csv(forecast_csv_path, index=False, chunksize=10_000)
+        print(f"Saved forecast to {forecast_csv_path}")
     
-    # Update historical data files
-    concat_df_if_new_date(str(REF_PATH), new_historical_output)
-    concat_df_if_new_date(str(PROJECT_ROOT / "data" / "index_historical_data.csv"), new_indices_output)
-    concat_df_if_new_date(str(PROJECT_ROOT / "data" / "sentiment_features.csv"), new_sentiment_output)
+    # Update historical data files; each call locks and appends to its own file, so the
+    # three run side by side (list() surfaces any exception raised in a worker)
+    updates = [
+        (str(REF_PATH), new_historical_output),
+        (str(PROJECT_ROOT / "data" / "index_historical_data.csv"), new_indices_output),
+        (str(PROJECT_ROOT / "data" / "sentiment_features.csv"), new_sentiment_output),
+    ]
+    with ThreadPoolExecutor(max_workers=len(updates)) as executor:
+        list(executor.map(lambda update: concat_df_if_new_date(*update), updates))
     
     return forecast_df, new_historical_output, new_indices_output, new_sentiment_output
 
 
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, appends are unguarded
+    fcntl = None
+
 def concat_df_if_new_date(path, df, date_col="SEANCE"):
-    df_existing = pd.read_csv(path)
+    # Hold an exclusive (advisory) lock on the CSV from the date check through the append,
+    # so two concurrent refresh runs cannot both append the same day
+    with open(path, "r+", encoding="utf-8", newline="") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+
+        # Only the date column is needed to decide what is new; the Parquet mirror, when
+        # up to date, serves it without parsing the CSV
+        mirror = fresh_mirror(path)
+        if mirror is not None:
+            existing_dates = pd.read_parquet(mirror, engine="pyarrow", columns=[date_col])[date_col]
+        else:
+            # Arrow's reader types ISO dates as timestamps while tokenizing; anything it
+            # cannot parse stays text and is coerced below
+            existing_dates = pd.read_csv(path, usecols=[date_col], engine="pyarrow")[date_col]
 
-    # normalize both sides
-    df_existing[date_col] = pd.to_datetime(df_existing[date_col], errors="coerce").dt.normalize()
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+        # normalize both sides; only text dates (CSV fallback, unparsed frames) go through to_datetime
+        if not pd.api.types.is_datetime64_any_dtype(existing_dates):
+            existing_dates = pd.to_datetime(existing_dates, errors="coerce")
+        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+            df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+        # Casting to datetime64[D] floors to the day on the raw int64 values (normalize + no boxing)
+        existing_days = existing_dates.to_numpy(dtype="datetime64[D]")
+        new_days = df[date_col].to_numpy(dtype="datetime64[D]")
+        df[date_col] = new_days.astype("datetime64[ns]")
 
-    new_dates = set(df[date_col].dropna().unique())
-    existing_dates = set(df_existing[date_col].dropna().unique())
+        # Diff the distinct days on both sides (sorted uniques) before touching any row
+        existing_days = np.unique(existing_days[~np.isnat(existing_days)])
+        distinct_new_days = np.unique(new_days[~np.isnat(new_days)])
+        missing = distinct_new_days[~np.isin(distinct_new_days, existing_days, assume_unique=True)]
+        if missing.size == 0:
+            print(f"  Skip {path}: date(s) already exist -> {list(pd.DatetimeIndex(distinct_new_days))}")
+            return
 
-    if new_dates.issubset(existing_dates):
-        print(f"  Skip {path}: date(s) already exist -> {sorted(new_dates)}")
-        return
+        new_rows = df[np.isin(new_days, missing)]
+        new_dates = list(pd.DatetimeIndex(missing))
 
-    df_out = pd.concat([df_existing, df], ignore_index=True)
-    df_out.to_csv(path, index=False)
-    print(f" Appended to {path}: {sorted(new_dates - existing_dates)}")
+        # Append only the new rows, in the file's column order, instead of rewriting the whole history
+        file_columns = pd.read_csv(path, nrows=0).columns
+        csv_text = new_rows.reindex(columns=file_columns).to_csv(header=False, index=False)
+        f.seek(0, os.SEEK_END)
+        # Without a trailing newline the first appended row would be glued onto the last line
+        if os.path.getsize(path):
+            with open(path, "rb") as tail:
+                tail.seek(-1, os.SEEK_END)
+                if tail.read(1) != b"\n":
+                    f.write("\n")
+        f.write(csv_text)
+        f.flush()
+        # Keep the mirror in step with the CSV instead of leaving it stale for a full rebuild
+        if mirror is not None:
+            append_to_mirror(mirror, path, file_columns, csv_text)
+        print(f" Appended to {path}: {new_dates}")
 
 
 if __name__ == "__main__":
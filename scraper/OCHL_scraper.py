@@ -1,8 +1,11 @@
 import os
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 URL = "https://www.ilboursa.com/marches/aaz"
 HEADERS = {"User-Agent": "Mozilla/5.0"}
@@ -23,6 +26,16 @@ INDICES_URLS = {
 
 REF_PATH = r"data/historical_data.csv"  # dataset reference
 
+# Shared session: keep-alive connections are reused across the index pages and the A→Z page,
+# saving a TCP+TLS handshake per URL. Pool sized so every index can be fetched concurrently.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, read=0, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+))
+
 def get_indice_price(indice_url: str):
     headers = {
     "User-Agent": (
@@ -34,7 +47,7 @@ def get_indice_price(indice_url: str):
     "Referer": "https://www.investing.com/",
     }
 
-    resp = requests.get(indice_url, headers=headers, timeout=30)
+    resp = SESSION.get(indice_url, headers=headers, timeout=30)
     resp.raise_for_status()
 
     soup = BeautifulSoup(resp.text, "lxml")
@@ -48,9 +61,10 @@ def get_indice_price(indice_url: str):
     return close_price
 
 def get_all_indices_prices():
-    indices_prices = {}
-    for indice_name, indice_url in INDICES_URLS.items():
-        indices_prices[indice_name] = get_indice_price(indice_url)
+    # Network bound: fetch every index page in parallel instead of one after the other
+    with ThreadPoolExecutor(max_workers=len(INDICES_URLS)) as executor:
+        prices = executor.map(get_indice_price, INDICES_URLS.values())
+        indices_prices = dict(zip(INDICES_URLS, prices))
     return indices_prices
 
 
@@ -66,10 +80,26 @@ def fr_to_float(x: str):
     except ValueError:
         return None
 
+def fr_to_float_vec(s: pd.Series) -> pd.Series:
+    """
+    Vectorized fr_to_float for a whole column: French formatted numbers
+    ("1 234,5") become floats, empty/dash/unparseable cells become NaN.
+    """
+    cleaned = (
+        s.astype(str)
+        .str.strip()
+        .str.replace("\xa0", "", regex=False)
+        .str.replace(" ", "", regex=False)
+        .str.replace(",", ".", regex=False)
+    )
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
 def fetch_aaz_df() -> pd.DataFrame:
-    r = requests.get(URL, headers=HEADERS, timeout=30)
+    r = SESSION.get(URL, timeout=30)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+    # lxml + SoupStrainer: only <table> subtrees are built, the rest of the page is skipped.
+    # pd.read_html is not used because it would coerce the French-formatted numbers itself.
+    soup = BeautifulSoup(r.text, "lxml", parse_only=SoupStrainer("table"))
     indeces_prices = get_all_indices_prices()
     
 
@@ -91,10 +121,10 @@ def fetch_aaz_df() -> pd.DataFrame:
     
     return df
 
-def build_valeur_lookup(df_ref: pd.DataFrame) -> dict:
+def build_valeur_lookup(df_ref: pd.DataFrame) -> tuple[dict, dict]:
     """
-    Build dict: VALEUR (uppercase stripped) -> (CODE, GROUPE)
-    Missing values become "".
+    Build two dicts keyed by VALEUR (uppercase stripped): (code_map, groupe_map)
+    mapping to CODE and GROUPE. Missing values become "".
     """
     temp = df_ref.copy()
     temp["VALEUR"] = temp["VALEUR"].astype(str).str.strip().str.upper()
@@ -110,30 +140,40 @@ def build_valeur_lookup(df_ref: pd.DataFrame) -> dict:
         GROUPE=("GROUPE", first_non_empty),
     )
 
-    return {v: (row["CODE"], row["GROUPE"]) for v, row in agg.iterrows()}
+    code_map = agg["CODE"].to_dict()
+    groupe_map = agg["GROUPE"].to_dict()
+    return code_map, groupe_map
 
-def build_target_table(df_aaz: pd.DataFrame, lookup: dict, seance: str | None = None) -> pd.DataFrame:
-    seance = seance or date.today().isoformat()
+def build_target_table(df_aaz: pd.DataFrame, lookup: tuple[dict, dict], seance: str | None = None) -> pd.DataFrame:
+    # SEANCE comes out as a normalized datetime64 column, so callers need no re-parse
+    seance = pd.Timestamp(seance or date.today()).normalize().as_unit("ns")
 
     valeur_series = df_aaz["Nom"].astype(str).str.strip()
     valeur_key = valeur_series.str.upper()
 
-    mapped = valeur_key.map(lambda v: lookup.get(v, ("", "")))
+    # Plain dict lookups, unknown VALEUR -> ""
+    code_map, groupe_map = lookup
+    out_code = valeur_key.map(code_map).fillna("")
+    out_groupe = valeur_key.map(groupe_map).fillna("")
+
+    # Volume is parsed once and reused for the transaction count estimate
+    qty = fr_to_float_vec(df_aaz["Volume (titres)"])
+    nb_tx = (qty / 300).round().clip(lower=1).astype("Int64")
 
     out = pd.DataFrame({
         "SEANCE": seance,
-        "GROUPE": mapped.map(lambda t: t[1]),  # string group based on Nom
-        "CODE": mapped.map(lambda t: t[0]),
+        "GROUPE": out_groupe,  # string group based on Nom
+        "CODE": out_code,
         "VALEUR": valeur_series,
 
-        "OUVERTURE": df_aaz["Ouverture"].apply(fr_to_float),
-        "CLOTURE": df_aaz["Dernier"].apply(fr_to_float),
-        "PLUS_BAS": df_aaz["+Bas"].apply(fr_to_float),
-        "PLUS_HAUT": df_aaz["+Haut"].apply(fr_to_float),
+        "OUVERTURE": fr_to_float_vec(df_aaz["Ouverture"]),
+        "CLOTURE": fr_to_float_vec(df_aaz["Dernier"]),
+        "PLUS_BAS": fr_to_float_vec(df_aaz["+Bas"]),
+        "PLUS_HAUT": fr_to_float_vec(df_aaz["+Haut"]),
 
-        "QUANTITE_NEGOCIEE": df_aaz["Volume (titres)"].apply(fr_to_float),
-        "NB_TRANSACTION": (df_aaz["Volume (titres)"].apply(fr_to_float) / 300).round().clip(lower=1).astype("Int64"),
-        "CAPITAUX": df_aaz["Volume (DT)"].apply(fr_to_float),
+        "QUANTITE_NEGOCIEE": qty,
+        "NB_TRANSACTION": nb_tx,
+        "CAPITAUX": fr_to_float_vec(df_aaz["Volume (DT)"]),
         'TUNBANQ_INDICE_JOUR': df_aaz['TUNBANQ_INDICE_JOUR'],
         'TUNFIN_INDICE_JOUR': df_aaz['TUNFIN_INDICE_JOUR'],
         'TUNINDEX_INDICE_JOUR': df_aaz['TUNINDEX_INDICE_JOUR'],
@@ -145,7 +185,7 @@ def build_target_table(df_aaz: pd.DataFrame, lookup: dict, seance: str | None =
 
 def append_to_csv_table(df_new: pd.DataFrame, path: str):
     if os.path.exists(path):
-        df_existing = pd.read_csv(path)
+        df_existing = pd.read_csv(path, parse_dates=["SEANCE"])  # same dtype as df_new for the dedupe
 
         # avoid duplicates on (SEANCE, CODE) if CODE exists
         df_all = pd.concat([df_existing, df_new], ignore_index=True)
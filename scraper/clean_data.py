@@ -20,71 +20,46 @@ def generate_dummy_dataset(
     rng = np.random.default_rng(seed)
 
     dates = pd.date_range(start_date, end_date, freq="D")
-    rows = []
-
-    # Keep a last close per enterprise so prices evolve smoothly (not random jumps)
-    last_close = {}
-    for e in enterprises:
-        key = (e["VALEUR"], e["CODE"])
-        last_close[key] = float(e.get("base_price", 10.0))
-
-    for d in dates:
-        seance = d.date().isoformat()
-
-        for e in enterprises:
-            valeur = e["VALEUR"]
-            code = e["CODE"]
-            groupe = int(e.get("GROUPE", 0))
-            key = (valeur, code)
-
-            prev_close = last_close[key]
-
-            # Daily move (small drift + noise)
-            # You can tune these numbers to be more/less volatile
-            daily_ret = rng.normal(loc=0.0003, scale=0.02)  # ~2% std
-            close = max(0.1, prev_close * (1.0 + daily_ret))
-
-            # Open near previous close
-            open_ = max(0.1, prev_close * (1.0 + rng.normal(0, 0.005)))
-
-            # Intraday range
-            base = max(open_, close)
-            low_base = min(open_, close)
-
-            # Make high/low consistent
-            up_wick = abs(rng.normal(0.0, 0.01))   # ~1% wick
-            dn_wick = abs(rng.normal(0.0, 0.01))
-
-            high = base * (1.0 + up_wick)
-            low = low_base * (1.0 - dn_wick)
-            low = max(0.1, low)
-
-            # Ensure strict ordering
-            high = max(high, open_, close)
-            low = min(low, open_, close)
-
-            # Volume & transactions
-            qty = int(rng.integers(50, 100_000))
-            nb_tx = int(rng.integers(1, max(2, qty // 200)))  # correlated-ish
-            cap = round(qty * close, 2)
-
-            rows.append({
-                "SEANCE": seance,
-                "GROUPE": groupe,
-                "CODE": code,
-                "VALEUR": valeur,
-                "OUVERTURE": round(open_, 3),
-                "CLOTURE": round(close, 3),
-                "PLUS_BAS": round(low, 3),
-                "PLUS_HAUT": round(high, 3),
-                "QUANTITE_NEGOCIEE": qty,
-                "NB_TRANSACTION": nb_tx,
-                "CAPITAUX": cap
-            })
-
-            last_close[key] = close
-
-    df = pd.DataFrame(rows, columns=COLUMNS)
+    n_days, n_ent = len(dates), len(enterprises)
+    shape = (n_days, n_ent)
+
+    base_prices = np.array([float(e.get("base_price", 10.0)) for e in enterprises])
+
+    # Daily move (small drift + noise), compounded along time so prices evolve smoothly
+    # You can tune these numbers to be more/less volatile
+    daily_ret = rng.normal(loc=0.0003, scale=0.02, size=shape)  # ~2% std
+    closes = np.maximum(0.1, base_prices * np.cumprod(1.0 + daily_ret, axis=0))
+    prev_closes = np.vstack([base_prices[None, :], closes[:-1]])
+
+    # Open near previous close
+    opens = np.maximum(0.1, prev_closes * (1.0 + rng.normal(0, 0.005, size=shape)))
+
+    # Intraday range, high/low consistent with open/close
+    up_wick = np.abs(rng.normal(0.0, 0.01, size=shape))  # ~1% wick
+    dn_wick = np.abs(rng.normal(0.0, 0.01, size=shape))
+    highs = np.maximum(opens, closes) * (1.0 + up_wick)
+    low_base = np.minimum(opens, closes)
+    lows = np.minimum(np.maximum(0.1, low_base * (1.0 - dn_wick)), low_base)  # strict ordering
+
+    # Volume & transactions
+    qty = rng.integers(50, 100_000, size=shape)
+    nb_tx = rng.integers(1, np.maximum(2, qty // 200))  # correlated-ish
+    cap = np.round(qty * closes, 2)
+
+    # Row-major flattening: one row per (date, enterprise)
+    df = pd.DataFrame({
+        "SEANCE": np.repeat(dates.strftime("%Y-%m-%d").to_numpy(), n_ent),
+        "GROUPE": np.tile([int(e.get("GROUPE", 0)) for e in enterprises], n_days),
+        "CODE": np.tile([e["CODE"] for e in enterprises], n_days),
+        "VALEUR": np.tile([e["VALEUR"] for e in enterprises], n_days),
+        "OUVERTURE": np.round(opens, 3).ravel(),
+        "CLOTURE": np.round(closes, 3).ravel(),
+        "PLUS_BAS": np.round(lows, 3).ravel(),
+        "PLUS_HAUT": np.round(highs, 3).ravel(),
+        "QUANTITE_NEGOCIEE": qty.ravel(),
+        "NB_TRANSACTION": nb_tx.ravel(),
+        "CAPITAUX": cap.ravel(),
+    }, columns=COLUMNS)
 
     # Sort to keep dataset "in order"
     df = df.sort_values(["SEANCE", "VALEUR", "CODE"]).reset_index(drop=True)